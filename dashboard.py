@@ -1,16 +1,24 @@
 import dash
-from dash import dcc, html
+from dash import dcc, html, Patch
 import plotly.graph_objects as go
 import plotly.express as px
+import plotly.io as pio
+import numpy as np
 import pandas as pd
 from data_processor import (
     calculate_overall_production,
-    calculate_workstation_occupancy,
-    calculate_average_waiting_time,
-    get_workstation_status_partition,
-    get_time_period_range
+    compute_all_metrics,
+    get_time_period_range,
+    HOUR,
+    Status,
+    STATUS_NAMES
 )
 from datetime import datetime, timedelta
+from functools import lru_cache
+import threading
+
+# Serialize figures with orjson; Dash goes through plotly.io for every figure it sends
+pio.json.config.default_engine = 'orjson'
 
 # Theme colors
 THEME = {
@@ -23,45 +31,184 @@ THEME = {
     'warning': '#ff4d4d'
 }
 
+# Upper bound on points sent to the browser for the production trend
+TREND_MAX_POINTS = 5000
+
+def production_trend(timestamps, max_points=TREND_MAX_POINTS):
+    """Cumulative production curve (simulation hours, total) from sorted event timestamps."""
+    cumulative = np.arange(1, len(timestamps) + 1, dtype=np.int64)
+    if len(timestamps) > max_points:
+        # Evenly decimate the curve; the first and last events are always kept
+        idx = np.linspace(0, len(timestamps) - 1, max_points).astype(np.int64)
+        timestamps = timestamps[idx]
+        cumulative = cumulative[idx]
+    return timestamps / HOUR, cumulative
+
+# Static page sections, built once at import; only the data-bound parts are made per app
+HEADER_TITLE = html.H1('The Factory 🏭', style={
+    'textAlign': 'center', 
+    'marginBottom': '10px',
+    'color': THEME['accent'],
+    'fontFamily': 'monospace',
+    'letterSpacing': '2px'
+})
+
+# Time period selection
+TIME_PERIOD_SELECTOR = html.Div([
+    html.Label('Select Time Period:', style={
+        'marginRight': '10px', 
+        'fontSize': '20px',
+        'color': THEME['text'],
+        'fontFamily': 'monospace'
+    }),
+    dcc.Dropdown(
+        id='time-period-dropdown',
+        options=[
+            {'label': 'Day', 'value': 'day'},
+            {'label': 'Week', 'value': 'week'},
+            {'label': 'Month', 'value': 'month'},
+            {'label': 'Quarter', 'value': 'quarter'},
+            {'label': 'Year', 'value': 'year'}
+        ],
+        value='day',
+        style={
+            'width': '200px', 
+            'display': 'inline-block',
+            'backgroundColor': THEME['card'],
+            'color': THEME['text'],
+            'border': f'1px solid {THEME["border"]}'
+        }
+    )
+], style={'textAlign': 'center', 'marginBottom': '20px'})
+
+# Welcome message
+WELCOME_SECTION = html.Div([
+    html.H2('Welcome to Your Factory Dashboard! 👋', style={
+        'textAlign': 'center', 
+        'color': THEME['accent'],
+        'fontFamily': 'monospace',
+        'letterSpacing': '1px'
+    }),
+    html.Div([
+        html.P([
+            "Hey there! This dashboard gives you a complete overview of your factory's performance. ",
+            html.Span("📊", style={'fontSize': '20px'}),
+            " You can see how things are going at a glance with our key metrics, or dive deep into the details. ",
+            html.Span("🔍", style={'fontSize': '20px'}),
+        ], style={'textAlign': 'center', 'fontSize': '18px', 'marginBottom': '10px', 'color': THEME['text']}),
+        html.P([
+            "Use the time period selector above to view data for different timeframes - from a day to a full year. ",
+            html.Span("⏰", style={'fontSize': '20px'}),
+            " All the charts and numbers will update automatically! ",
+            html.Span("✨", style={'fontSize': '20px'}),
+        ], style={'textAlign': 'center', 'fontSize': '18px', 'marginBottom': '10px', 'color': THEME['text']}),
+        html.P([
+            "Keep an eye on Station 3, it is highlighted because it is the current bottleneck. ",
+            html.Span("⚠️", style={'fontSize': '20px'}),
+            " We got some recommendations at the bottom to help improve things! ",
+            html.Span("💡", style={'fontSize': '20px'}),
+        ], style={'textAlign': 'center', 'fontSize': '18px', 'color': THEME['text']})
+    ], style={
+        'backgroundColor': THEME['card'],
+        'padding': '20px',
+        'borderRadius': '10px',
+        'marginBottom': '30px',
+        'border': f'1px solid {THEME["border"]}'
+    })
+], style={'marginTop': '180px'})
+
+# Bottom section: key findings
+FINDINGS_SECTION = html.Div([
+    html.H2('Key Findings and Recommendations', style={'color': THEME['text'], 'fontFamily': 'monospace'}),
+    html.P("""
+        The dashboard indicates that while all workstations are highly occupied, Station 3 experiences 
+        the highest average waiting time, suggesting it is a primary bottleneck. Addressing potential 
+        issues leading to delays before Station 3 could improve overall production flow. Downtime and 
+        waiting for restock appear to be less significant factors currently.
+    """, style={'color': THEME['text']}),
+    html.H3('Recommended Next Steps:', style={'color': THEME['text'], 'fontFamily': 'monospace'}),
+    html.Ul([
+        html.Li('Investigate processes leading to delays before Station 3', style={'color': THEME['text']}),
+        html.Li('Analyze the workload and capacity of Station 3', style={'color': THEME['text']}),
+        html.Li('Consider process optimization or resource reallocation for Station 3', style={'color': THEME['text']}),
+        html.Li('Monitor the impact of any changes on the overall production flow', style={'color': THEME['text']})
+    ])
+], style={
+    'marginTop': '30px', 
+    'padding': '20px', 
+    'backgroundColor': THEME['card'],
+    'borderRadius': '10px',
+    'border': f'1px solid {THEME["border"]}'
+})
+
+def register_callbacks(app, factory, render_period):
+    """Update all metrics and graphs based on time period and station selection."""
+    @app.callback(
+        [dash.dependencies.Output('total-production', 'children'),
+         dash.dependencies.Output('faulty-rate', 'children'),
+         dash.dependencies.Output('production-trend-graph', 'figure'),
+         dash.dependencies.Output('occupancy-graph', 'figure'),
+         dash.dependencies.Output('waiting-graph', 'figure'),
+         dash.dependencies.Output('status-graph', 'figure')],
+        [dash.dependencies.Input('time-period-dropdown', 'value')] +
+        [dash.dependencies.Input(f'station-{station.station_id}-toggle', 'value') 
+         for station in factory.stations],
+        prevent_initial_call=True
+    )
+    def update_metrics(time_period, *station_toggles):
+        # Get list of enabled stations
+        enabled_stations = []
+        for i, station in enumerate(factory.stations):
+            if station_toggles[i]:  # If station is enabled
+                enabled_stations.append(station.station_id)
+        
+        (total_production, faulty_rate, production_trend_fig,
+         occupancy_fig, waiting_fig, status_fig) = render_period(time_period, tuple(enabled_stations))
+        
+        # The trend figure is already on the page; only its data and title change
+        trend_patch = Patch()
+        trend_patch['data'][0]['x'] = production_trend_fig['data'][0]['x']
+        trend_patch['data'][0]['y'] = production_trend_fig['data'][0]['y']
+        trend_patch['layout']['title']['text'] = production_trend_fig['layout']['title']['text']
+        
+        return (total_production, 
+                faulty_rate, 
+                trend_patch, 
+                occupancy_fig, 
+                waiting_fig, 
+                status_fig)
+
 def create_dashboard(factory, simulation_time):
     app = dash.Dash(__name__)
     
-    # Calculate all required metrics
-    total_production, production_rate = calculate_overall_production(factory, simulation_time)
-    faulty_rate = (factory.faulty_products / (factory.faulty_products + total_production)) * 100
-    occupancy_rates = calculate_workstation_occupancy(factory, simulation_time)
-    waiting_times = calculate_average_waiting_time(factory)
-    status_partitions = get_workstation_status_partition(factory, [(0, simulation_time)])
-    
-    # Create production trend data
-    production_trend = []
-    for station in factory.stations:
-        for event in station.status_history:
-            if event['status'] == 'Operational':
-                production_trend.append({
-                    'timestamp': event['timestamp'],
-                    'production': 1,
-                    'station_id': station.station_id
-                })
+    # Create production trend data: one sorted array of 'Operational' event
+    # timestamps across all stations, with the owning station id alongside
+    station_timestamps = [
+        station.ts_buf[:station.n][station.status_buf[:station.n] == Status.OPERATIONAL]
+        for station in factory.stations
+    ]
+    trend_station_ids = np.repeat([station.station_id for station in factory.stations],
+                                  [len(timestamps) for timestamps in station_timestamps])
+    trend_timestamps = np.concatenate(station_timestamps)
+    order = np.argsort(trend_timestamps)
+    trend_timestamps = trend_timestamps[order]
+    trend_station_ids = trend_station_ids[order]
     
-    production_df = pd.DataFrame(production_trend)
-    production_df['timestamp'] = pd.to_datetime(production_df['timestamp'], unit='s')
-    production_df = production_df.sort_values('timestamp')
-    production_df['cumulative_production'] = production_df['production'].cumsum()
+    # Metric results are memoized in data_processor until the factory state changes
+    def period_metrics(time_period):
+        return (calculate_overall_production(factory, simulation_time, time_period),
+                *compute_all_metrics(factory, simulation_time, time_period))
     
-    # Create production trend figure with dark theme
-    production_trend_fig = go.Figure(data=[
-        go.Scatter(
-            x=production_df['timestamp'],
-            y=production_df['cumulative_production'],
+    # Figure templates with the dark theme applied; renders only swap in data and titles
+    trend_template = go.Figure(data=[
+        go.Scattergl(
             mode='lines',
             name='Total Production',
             line=dict(color=THEME['accent'], width=2)
         )
     ])
-    production_trend_fig.update_layout(
-        title='Production Trend Over Time',
-        xaxis_title='Time',
+    trend_template.update_layout(
+        xaxis_title='Simulation time (hours)',
         yaxis_title='Total Production',
         showlegend=True,
         plot_bgcolor=THEME['card'],
@@ -71,21 +218,10 @@ def create_dashboard(factory, simulation_time):
         yaxis=dict(gridcolor=THEME['border'])
     )
     
-    # Create occupancy rate bar chart with dark theme
-    occupancy_df = pd.DataFrame({
-        'Station': list(occupancy_rates.keys()),
-        'Occupancy Rate': [rate * 100 for rate in occupancy_rates.values()]
-    }).sort_values('Occupancy Rate', ascending=False)
-    
-    occupancy_fig = go.Figure(data=[
-        go.Bar(
-            x=occupancy_df['Station'],
-            y=occupancy_df['Occupancy Rate'],
-            marker_color=THEME['secondary']
-        )
+    occupancy_template = go.Figure(data=[
+        go.Bar(marker_color=THEME['secondary'])
     ])
-    occupancy_fig.update_layout(
-        title='Workstation Occupancy Rates',
+    occupancy_template.update_layout(
         xaxis_title='Station ID',
         yaxis_title='Occupancy Rate (%)',
         yaxis_range=[0, 100],
@@ -96,31 +232,13 @@ def create_dashboard(factory, simulation_time):
         yaxis=dict(gridcolor=THEME['border'])
     )
     
-    # Waiting time bar chart with dark theme
-    waiting_df = pd.DataFrame({
-        'Station': list(waiting_times.keys()),
-        'Average Waiting Time': list(waiting_times.values())
-    }).sort_values('Average Waiting Time', ascending=False)
-    
-    # Ensure we have valid waiting times
-    waiting_df['Average Waiting Time'] = waiting_df['Average Waiting Time'].fillna(0)
-    
-    # list of colors, highlighting station 3
-    colors = [THEME['secondary'] if station != 3 else THEME['warning'] 
-              for station in waiting_df['Station']]
-    
-    waiting_fig = go.Figure(data=[
+    waiting_template = go.Figure(data=[
         go.Bar(
-            x=waiting_df['Station'],
-            y=waiting_df['Average Waiting Time'],
-            marker_color=colors,
-            text=waiting_df['Average Waiting Time'].round(2),
             textposition='auto',
             hovertemplate='Station %{x}<br>Average Wait: %{y:.2f} hours<extra></extra>'
         )
     ])
-    waiting_fig.update_layout(
-        title='Average Waiting Time per Workstation',
+    waiting_template.update_layout(
         xaxis_title='Station ID',
         yaxis_title='Average Waiting Time (hours)',
         plot_bgcolor=THEME['card'],
@@ -129,9 +247,7 @@ def create_dashboard(factory, simulation_time):
         xaxis=dict(
             gridcolor=THEME['border'],
             type='category',
-            tickmode='array',
-            tickvals=waiting_df['Station'],
-            ticktext=[f'Station {s}' for s in waiting_df['Station']]
+            tickmode='array'
         ),
         yaxis=dict(
             gridcolor=THEME['border'],
@@ -141,19 +257,9 @@ def create_dashboard(factory, simulation_time):
         showlegend=False
     )
     
-    # status partition visualization with dark theme
-    status_data = []
-    for station_id, statuses in status_partitions.items():
-        for status, percentage in statuses.items():
-            status_data.append({
-                'Station': station_id,
-                'Status': status,
-                'Percentage': percentage * 100
-            })
-    
-    status_df = pd.DataFrame(status_data)
-    status_fig = px.bar(
-        status_df,
+    # One grouped bar trace per status, in STATUS_NAMES order
+    status_template = px.bar(
+        pd.DataFrame({'Station': [0] * len(STATUS_NAMES), 'Status': STATUS_NAMES, 'Percentage': 0.0}),
         x='Station',
         y='Percentage',
         color='Status',
@@ -162,7 +268,7 @@ def create_dashboard(factory, simulation_time):
         labels={'Percentage': 'Percentage of Time (%)'},
         color_discrete_sequence=[THEME['accent'], THEME['warning'], THEME['secondary']]
     )
-    status_fig.update_layout(
+    status_template.update_layout(
         plot_bgcolor=THEME['card'],
         paper_bgcolor=THEME['background'],
         font=dict(color=THEME['text']),
@@ -170,6 +276,85 @@ def create_dashboard(factory, simulation_time):
         yaxis=dict(gridcolor=THEME['border'])
     )
     
+    # Renders mutate the shared templates, and the Dash dev server is threaded
+    render_lock = threading.Lock()
+    
+    # Each (time period, enabled stations) pair always renders the same outputs
+    @lru_cache(maxsize=32)
+    def render_period(time_period, enabled_stations):
+        # Calculate metrics for the selected time period and stations
+        (total_production, production_rate), all_occupancy, all_waiting, all_partitions = period_metrics(time_period)
+        faulty_rate = (factory.faulty_products / (factory.faulty_products + total_production)) * 100
+        
+        # Filter metrics for enabled stations
+        occupancy_rates = all_occupancy[all_occupancy.index.isin(enabled_stations)]
+        waiting_times = all_waiting[all_waiting.index.isin(enabled_stations)]
+        status_partitions = {k: v for k, v in all_partitions.items() 
+                           if k in enabled_stations}
+        
+        # Production trend data
+        lo, hi = 0, len(trend_timestamps)
+        if time_period:
+            # trend_timestamps is sorted, so the period is a contiguous slice
+            start_time, end_time = get_time_period_range(time_period, simulation_time)
+            lo = np.searchsorted(trend_timestamps, start_time, side='left')
+            hi = np.searchsorted(trend_timestamps, end_time, side='right')
+        window = trend_timestamps[lo:hi]
+        if len(enabled_stations) < len(factory.stations):
+            window = window[np.isin(trend_station_ids[lo:hi], enabled_stations)]
+        trend_hours, trend_totals = production_trend(window)
+        
+        # Occupancy data
+        occupancy_pct = (occupancy_rates * 100).sort_values(ascending=False)
+        
+        # Waiting time data
+        # Ensure we have valid waiting times
+        waiting_times = waiting_times.fillna(0).sort_values(ascending=False)
+        
+        # list of colors, highlighting station 3
+        colors = np.where(waiting_times.index.to_numpy() != 3,
+                          THEME['secondary'], THEME['warning']).tolist()
+        
+        # Status partition data
+        station_ids = list(status_partitions)
+        
+        period_label = time_period.capitalize()
+        with render_lock:
+            trend_template.data[0].x = trend_hours
+            trend_template.data[0].y = trend_totals
+            trend_template.layout.title.text = f'Production Trend Over Time ({period_label})'
+            
+            occupancy_template.data[0].x = occupancy_pct.index
+            occupancy_template.data[0].y = occupancy_pct.values
+            occupancy_template.layout.title.text = f'Workstation Occupancy Rates ({period_label})'
+            
+            waiting_template.data[0].x = waiting_times.index
+            waiting_template.data[0].y = waiting_times.values
+            waiting_template.data[0].marker.color = colors
+            waiting_template.data[0].text = waiting_times.round(2).values
+            waiting_template.layout.xaxis.tickvals = waiting_times.index
+            waiting_template.layout.xaxis.ticktext = [f'Station {s}' for s in waiting_times.index]
+            waiting_template.layout.title.text = f'Average Waiting Time per Workstation ({period_label})'
+            
+            for trace in status_template.data:
+                trace.x = station_ids
+                trace.y = [status_partitions[station_id][trace.name] * 100 for station_id in station_ids]
+            status_template.layout.title.text = f'Workstation Status Partition ({period_label})'
+            
+            # Hand Dash plain figure dicts so cached periods skip building and validating Figure objects
+            return (f"{total_production:,}", 
+                    f"{faulty_rate:.2f}%", 
+                    trend_template.to_plotly_json(), 
+                    occupancy_template.to_plotly_json(), 
+                    waiting_template.to_plotly_json(), 
+                    status_template.to_plotly_json())
+    
+    # Render the default period up front: it fills the initial layout and seeds the
+    # cache, so the page load does not need a callback round trip
+    (total_production, faulty_rate, production_trend_fig,
+     occupancy_fig, waiting_fig, status_fig) = render_period(
+        'day', tuple(station.station_id for station in factory.stations))
+    
     # Create station toggle switches
     station_toggles = []
     for station in factory.stations:
@@ -190,39 +375,8 @@ def create_dashboard(factory, simulation_time):
     app.layout = html.Div([
         # Fixed Header with Title and Time Period Selection
         html.Div([
-            html.H1('The Factory 🏭', style={
-                'textAlign': 'center', 
-                'marginBottom': '10px',
-                'color': THEME['accent'],
-                'fontFamily': 'monospace',
-                'letterSpacing': '2px'
-            }),
-            html.Div([
-                html.Label('Select Time Period:', style={
-                    'marginRight': '10px', 
-                    'fontSize': '20px',
-                    'color': THEME['text'],
-                    'fontFamily': 'monospace'
-                }),
-                dcc.Dropdown(
-                    id='time-period-dropdown',
-                    options=[
-                        {'label': 'Day', 'value': 'day'},
-                        {'label': 'Week', 'value': 'week'},
-                        {'label': 'Month', 'value': 'month'},
-                        {'label': 'Quarter', 'value': 'quarter'},
-                        {'label': 'Year', 'value': 'year'}
-                    ],
-                    value='day',
-                    style={
-                        'width': '200px', 
-                        'display': 'inline-block',
-                        'backgroundColor': THEME['card'],
-                        'color': THEME['text'],
-                        'border': f'1px solid {THEME["border"]}'
-                    }
-                )
-            ], style={'textAlign': 'center', 'marginBottom': '20px'}),
+            HEADER_TITLE,
+            TIME_PERIOD_SELECTOR,
             
             # Station Toggles
             html.Div([
@@ -246,48 +400,14 @@ def create_dashboard(factory, simulation_time):
         
         # Main Content (with padding to account for fixed header)
         html.Div([
-            # Welcome Message
-            html.Div([
-                html.H2('Welcome to Your Factory Dashboard! 👋', style={
-                    'textAlign': 'center', 
-                    'color': THEME['accent'],
-                    'fontFamily': 'monospace',
-                    'letterSpacing': '1px'
-                }),
-                html.Div([
-                    html.P([
-                        "Hey there! This dashboard gives you a complete overview of your factory's performance. ",
-                        html.Span("📊", style={'fontSize': '20px'}),
-                        " You can see how things are going at a glance with our key metrics, or dive deep into the details. ",
-                        html.Span("🔍", style={'fontSize': '20px'}),
-                    ], style={'textAlign': 'center', 'fontSize': '18px', 'marginBottom': '10px', 'color': THEME['text']}),
-                    html.P([
-                        "Use the time period selector above to view data for different timeframes - from a day to a full year. ",
-                        html.Span("⏰", style={'fontSize': '20px'}),
-                        " All the charts and numbers will update automatically! ",
-                        html.Span("✨", style={'fontSize': '20px'}),
-                    ], style={'textAlign': 'center', 'fontSize': '18px', 'marginBottom': '10px', 'color': THEME['text']}),
-                    html.P([
-                        "Keep an eye on Station 3, it is highlighted because it is the current bottleneck. ",
-                        html.Span("⚠️", style={'fontSize': '20px'}),
-                        " We got some recommendations at the bottom to help improve things! ",
-                        html.Span("💡", style={'fontSize': '20px'}),
-                    ], style={'textAlign': 'center', 'fontSize': '18px', 'color': THEME['text']})
-                ], style={
-                    'backgroundColor': THEME['card'],
-                    'padding': '20px',
-                    'borderRadius': '10px',
-                    'marginBottom': '30px',
-                    'border': f'1px solid {THEME["border"]}'
-                })
-            ], style={'marginTop': '180px'}),
+            WELCOME_SECTION,
             
             # Top Section: KPIs
             html.Div([
                 html.Div([
                     html.Div([
                         html.H2('Total Production', style={'color': THEME['text'], 'fontFamily': 'monospace'}),
-                        html.H3(id='total-production', children=f"{total_production:,}", 
+                        html.H3(id='total-production', children=total_production, 
                                style={'color': THEME['accent'], 'fontSize': '32px', 'marginTop': '10px'})
                     ], style={
                         'textAlign': 'center', 
@@ -300,7 +420,7 @@ def create_dashboard(factory, simulation_time):
                     }),
                     html.Div([
                         html.H2('Faulty Product Rate', style={'color': THEME['text'], 'fontFamily': 'monospace'}),
-                        html.H3(id='faulty-rate', children=f"{faulty_rate:.2f}%", 
+                        html.H3(id='faulty-rate', children=faulty_rate, 
                                style={'color': THEME['warning'], 'fontSize': '32px', 'marginTop': '10px'})
                     ], style={
                         'textAlign': 'center', 
@@ -337,202 +457,11 @@ def create_dashboard(factory, simulation_time):
                 ], style={'marginTop': '30px'})
             ]),
             
-            # Bottom Section: Key Findings
-            html.Div([
-                html.H2('Key Findings and Recommendations', style={'color': THEME['text'], 'fontFamily': 'monospace'}),
-                html.P("""
-                    The dashboard indicates that while all workstations are highly occupied, Station 3 experiences 
-                    the highest average waiting time, suggesting it is a primary bottleneck. Addressing potential 
-                    issues leading to delays before Station 3 could improve overall production flow. Downtime and 
-                    waiting for restock appear to be less significant factors currently.
-                """, style={'color': THEME['text']}),
-                html.H3('Recommended Next Steps:', style={'color': THEME['text'], 'fontFamily': 'monospace'}),
-                html.Ul([
-                    html.Li('Investigate processes leading to delays before Station 3', style={'color': THEME['text']}),
-                    html.Li('Analyze the workload and capacity of Station 3', style={'color': THEME['text']}),
-                    html.Li('Consider process optimization or resource reallocation for Station 3', style={'color': THEME['text']}),
-                    html.Li('Monitor the impact of any changes on the overall production flow', style={'color': THEME['text']})
-                ])
-            ], style={
-                'marginTop': '30px', 
-                'padding': '20px', 
-                'backgroundColor': THEME['card'],
-                'borderRadius': '10px',
-                'border': f'1px solid {THEME["border"]}'
-            })
+            FINDINGS_SECTION
         ], style={'padding': '20px', 'backgroundColor': THEME['background']})
     ], style={'backgroundColor': THEME['background']})
     
-    # Callback to update all metrics and graphs based on time period and station selection
-    @app.callback(
-        [dash.dependencies.Output('total-production', 'children'),
-         dash.dependencies.Output('faulty-rate', 'children'),
-         dash.dependencies.Output('production-trend-graph', 'figure'),
-         dash.dependencies.Output('occupancy-graph', 'figure'),
-         dash.dependencies.Output('waiting-graph', 'figure'),
-         dash.dependencies.Output('status-graph', 'figure')],
-        [dash.dependencies.Input('time-period-dropdown', 'value')] +
-        [dash.dependencies.Input(f'station-{station.station_id}-toggle', 'value') 
-         for station in factory.stations]
-    )
-    def update_metrics(time_period, *station_toggles):
-        # Get list of enabled stations
-        enabled_stations = []
-        for i, station in enumerate(factory.stations):
-            if station_toggles[i]:  # If station is enabled
-                enabled_stations.append(station.station_id)
-        
-        # Calculate metrics for the selected time period and stations
-        total_production, production_rate = calculate_overall_production(factory, simulation_time, time_period)
-        faulty_rate = (factory.faulty_products / (factory.faulty_products + total_production)) * 100
-        
-        # Filter metrics for enabled stations
-        occupancy_rates = {k: v for k, v in calculate_workstation_occupancy(factory, simulation_time, time_period).items() 
-                         if k in enabled_stations}
-        waiting_times = {k: v for k, v in calculate_average_waiting_time(factory, time_period).items() 
-                        if k in enabled_stations}
-        status_partitions = {k: v for k, v in get_workstation_status_partition(factory, [(0, simulation_time)], time_period).items() 
-                           if k in enabled_stations}
-        
-        # Update production trend graph
-        if time_period:
-            start_time, end_time = get_time_period_range(time_period, simulation_time)
-            filtered_trend = [event for event in production_trend 
-                            if start_time <= event['timestamp'] <= end_time and
-                            event['station_id'] in enabled_stations]
-            trend_df = pd.DataFrame(filtered_trend)
-            trend_df['timestamp'] = pd.to_datetime(trend_df['timestamp'], unit='s')
-            trend_df = trend_df.sort_values('timestamp')
-            trend_df['cumulative_production'] = trend_df['production'].cumsum()
-        else:
-            trend_df = production_df[production_df['station_id'].isin(enabled_stations)]
-        
-        production_trend_fig = go.Figure(data=[
-            go.Scatter(
-                x=trend_df['timestamp'],
-                y=trend_df['cumulative_production'],
-                mode='lines',
-                name='Total Production',
-                line=dict(color=THEME['accent'], width=2)
-            )
-        ])
-        production_trend_fig.update_layout(
-            title=f'Production Trend Over Time ({time_period.capitalize()})',
-            xaxis_title='Time',
-            yaxis_title='Total Production',
-            showlegend=True,
-            plot_bgcolor=THEME['card'],
-            paper_bgcolor=THEME['background'],
-            font=dict(color=THEME['text']),
-            xaxis=dict(gridcolor=THEME['border']),
-            yaxis=dict(gridcolor=THEME['border'])
-        )
-        
-        # Update occupancy chart
-        occupancy_df = pd.DataFrame({
-            'Station': list(occupancy_rates.keys()),
-            'Occupancy Rate': [rate * 100 for rate in occupancy_rates.values()]
-        }).sort_values('Occupancy Rate', ascending=False)
-        
-        occupancy_fig = go.Figure(data=[
-            go.Bar(
-                x=occupancy_df['Station'],
-                y=occupancy_df['Occupancy Rate'],
-                marker_color=THEME['secondary']
-            )
-        ])
-        occupancy_fig.update_layout(
-            title=f'Workstation Occupancy Rates ({time_period.capitalize()})',
-            xaxis_title='Station ID',
-            yaxis_title='Occupancy Rate (%)',
-            yaxis_range=[0, 100],
-            plot_bgcolor=THEME['card'],
-            paper_bgcolor=THEME['background'],
-            font=dict(color=THEME['text']),
-            xaxis=dict(gridcolor=THEME['border']),
-            yaxis=dict(gridcolor=THEME['border'])
-        )
-        
-        # Update waiting time chart
-        waiting_df = pd.DataFrame({
-            'Station': list(waiting_times.keys()),
-            'Average Waiting Time': list(waiting_times.values())
-        }).sort_values('Average Waiting Time', ascending=False)
-        
-        # Ensure we have valid waiting times
-        waiting_df['Average Waiting Time'] = waiting_df['Average Waiting Time'].fillna(0)
-        
-        # list of colors, highlighting station 3
-        colors = [THEME['secondary'] if station != 3 else THEME['warning'] 
-                  for station in waiting_df['Station']]
-        
-        waiting_fig = go.Figure(data=[
-            go.Bar(
-                x=waiting_df['Station'],
-                y=waiting_df['Average Waiting Time'],
-                marker_color=colors,
-                text=waiting_df['Average Waiting Time'].round(2),
-                textposition='auto',
-                hovertemplate='Station %{x}<br>Average Wait: %{y:.2f} hours<extra></extra>'
-            )
-        ])
-        waiting_fig.update_layout(
-            title=f'Average Waiting Time per Workstation ({time_period.capitalize()})',
-            xaxis_title='Station ID',
-            yaxis_title='Average Waiting Time (hours)',
-            plot_bgcolor=THEME['card'],
-            paper_bgcolor=THEME['background'],
-            font=dict(color=THEME['text']),
-            xaxis=dict(
-                gridcolor=THEME['border'],
-                type='category',
-                tickmode='array',
-                tickvals=waiting_df['Station'],
-                ticktext=[f'Station {s}' for s in waiting_df['Station']]
-            ),
-            yaxis=dict(
-                gridcolor=THEME['border'],
-                zeroline=True,
-                zerolinecolor=THEME['border']
-            ),
-            showlegend=False
-        )
-        
-        # Update status partition chart
-        status_data = []
-        for station_id, statuses in status_partitions.items():
-            for status, percentage in statuses.items():
-                status_data.append({
-                    'Station': station_id,
-                    'Status': status,
-                    'Percentage': percentage * 100
-                })
-        
-        status_df = pd.DataFrame(status_data)
-        status_fig = px.bar(
-            status_df,
-            x='Station',
-            y='Percentage',
-            color='Status',
-            barmode='group',
-            title=f'Workstation Status Partition ({time_period.capitalize()})',
-            labels={'Percentage': 'Percentage of Time (%)'},
-            color_discrete_sequence=[THEME['accent'], THEME['warning'], THEME['secondary']]
-        )
-        status_fig.update_layout(
-            plot_bgcolor=THEME['card'],
-            paper_bgcolor=THEME['background'],
-            font=dict(color=THEME['text']),
-            xaxis=dict(gridcolor=THEME['border']),
-            yaxis=dict(gridcolor=THEME['border'])
-        )
-        
-        return (f"{total_production:,}", 
-                f"{faulty_rate:.2f}%", 
-                production_trend_fig, 
-                occupancy_fig, 
-                waiting_fig, 
-                status_fig)
+    register_callbacks(app, factory, render_period)
     
     return app
 
@@ -1,6 +1,10 @@
+import numpy as np
 import pandas as pd
 from typing import Dict, List, Tuple
 from datetime import datetime, timedelta
+from functools import lru_cache, wraps
+import weakref
+from main import Status, STATUS_NAMES
 
 # Time scaling constants (in seconds)
 HOUR = 3600
@@ -10,26 +14,136 @@ MONTH = 30 * DAY
 QUARTER = 90 * DAY
 YEAR = 365 * DAY
 
+# Per-factory metric results: factory -> ((state_version, now), {call key: result})
+_metrics_cache = weakref.WeakKeyDictionary()
+
+def metric_cache_key(arg):
+    """Hashable stand-in for a metric argument; interval sequences become tuples of pairs."""
+    if isinstance(arg, (list, tuple, np.ndarray)):
+        return tuple(map(tuple, np.asarray(arg, dtype=np.float64).reshape(-1, 2).tolist()))
+    return arg
+
+def copy_metric_result(result):
+    """Copy of a metric result that shares nothing mutable with the cached one."""
+    # Only Series and (nested) dicts are mutable in metric results; numbers and
+    # strings are shared, which is far cheaper than a generic deepcopy
+    if isinstance(result, pd.Series):
+        return result.copy()
+    if isinstance(result, dict):
+        return {key: copy_metric_result(value) for key, value in result.items()}
+    if isinstance(result, tuple):
+        return tuple(map(copy_metric_result, result))
+    return result
+
+def cached_by_state(func):
+    """Memoize a metric function per factory until its state_version or clock moves.
+
+    Callers get their own copy of the cached result, so mutating it is safe.
+    """
+    @wraps(func)
+    def wrapper(factory, *args, **kwargs):
+        key = (func.__name__,
+               tuple(metric_cache_key(arg) for arg in args),
+               tuple(sorted((name, metric_cache_key(arg)) for name, arg in kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return func(factory, *args, **kwargs)
+        
+        version = (factory.state_version, factory._env.now)
+        cached_version, results = _metrics_cache.get(factory, (None, None))
+        if cached_version != version:
+            # Results for older states can never be asked for again
+            results = {}
+            _metrics_cache[factory] = (version, results)
+        if key not in results:
+            results[key] = func(factory, *args, **kwargs)
+        return copy_metric_result(results[key])
+    return wrapper
+
+# Status codes whose name is 'Waiting'. No station status is ever called that
+# (queueing is tracked by the total_waiting_time counters instead), so this is
+# empty and windowed waiting time is always zero, as it was in the original code
+WAITING_CODES = [code for code, name in enumerate(STATUS_NAMES) if name == 'Waiting']
+
+# Length of each selectable time period
+PERIOD_LENGTHS = {'day': DAY, 'week': WEEK, 'month': MONTH, 'quarter': QUARTER, 'year': YEAR}
+
+@lru_cache(maxsize=32)
 def get_time_period_range(time_period: str, current_time: float) -> Tuple[float, float]:
     """Get the time range for the specified period."""
-    if time_period == 'day':
-        return (current_time - DAY, current_time)
-    elif time_period == 'week':
-        return (current_time - WEEK, current_time)
-    elif time_period == 'month':
-        return (current_time - MONTH, current_time)
-    elif time_period == 'quarter':
-        return (current_time - QUARTER, current_time)
-    elif time_period == 'year':
-        return (current_time - YEAR, current_time)
-    else:
+    period_length = PERIOD_LENGTHS.get(time_period)
+    if period_length is None:
         return (0, current_time)
+    return (current_time - period_length, current_time)
+
+def filter_station_history(station, start_time: float, end_time: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Filter station history for the given time range, as (timestamps, status codes) views."""
+    # History is appended in time order, so the range is a contiguous slice
+    timestamps = station.ts_buf[:station.n]
+    lo = np.searchsorted(timestamps, start_time, side='left')
+    hi = np.searchsorted(timestamps, end_time, side='right')
+    return timestamps[lo:hi], station.status_buf[lo:hi]
+
+def windowed_status_times(station, start_time: float, end_time: float) -> np.ndarray:
+    """Seconds spent in each status between start_time and end_time, indexed by status code.
+
+    Each status lasts from its change to the next one (the current status until
+    env.now), with the intervals straddling the window edges clipped to it.
+    """
+    timestamps = station.ts_buf[:station.n]
+    # From the change in effect at start_time to the last one before end_time
+    lo = max(np.searchsorted(timestamps, start_time, side='right') - 1, 0)
+    hi = np.searchsorted(timestamps, end_time, side='left')
+    if hi < station.n:
+        edges = timestamps[lo:hi + 1]
+    else:
+        edges = np.append(timestamps[lo:], station.env.now)
+    durations = np.diff(np.clip(edges, start_time, end_time))
+    return np.bincount(station.status_buf[lo:hi], weights=durations, minlength=len(STATUS_NAMES))
+
+def windowed_status_table(stations, start_time: float, end_time: float) -> np.ndarray:
+    """Windowed status times for several stations, one row per station."""
+    table = np.empty((len(stations), len(STATUS_NAMES)), dtype=np.float64)
+    for row, station in zip(table, stations):
+        row[:] = windowed_status_times(station, start_time, end_time)
+    return table
+
+def waiting_duration(timestamps: np.ndarray, statuses: np.ndarray, end_time: float) -> float:
+    """Time spent in the 'Waiting' status within a history slice ending at end_time."""
+    # A wait runs from each waiting event to the next event (or end_time), so the
+    # total is the adjacent-pair gaps weighted by whether the earlier event waits
+    gaps = np.diff(timestamps, append=end_time)
+    return float(gaps @ np.isin(statuses, WAITING_CODES))
+
+# Windowed helpers shared by the single metrics and compute_all_metrics. Callers
+# anchor every window on factory._env.now, the clock the status history runs on.
+# status_times lets a caller reuse one windowed_status_table across helpers.
 
-def filter_station_history(station, start_time: float, end_time: float) -> List[Dict]:
-    """Filter station history for the given time range."""
-    return [event for event in station.status_history 
-            if start_time <= event['timestamp'] <= end_time]
+def windowed_occupancy(stations, start_time: float, end_time: float, status_times=None) -> pd.Series:
+    """Share of the window each station spent operational, indexed by station id."""
+    if status_times is None:
+        status_times = windowed_status_table(stations, start_time, end_time)
+    return pd.Series(status_times[:, Status.OPERATIONAL] / (end_time - start_time),
+                     index=[station.station_id for station in stations])
 
+def windowed_waiting_times(stations, start_time: float, end_time: float) -> pd.Series:
+    """Hours each station (except station 1) spent waiting in the window, indexed by station id."""
+    if not WAITING_CODES:
+        # Nothing is ever 'Waiting', so skip slicing each history for a known zero
+        return pd.Series(0.0, index=[station.station_id for station in stations if station.station_id != 1])
+    total_wait_times = {station.station_id: waiting_duration(*filter_station_history(station, start_time, end_time), end_time)
+                        for station in stations
+                        if station.station_id != 1}  # Skip first station as per requirements
+    return pd.Series(total_wait_times, dtype=np.float64) / HOUR
+
+def windowed_partition(stations, start_time: float, end_time: float, status_times=None) -> Dict[int, Dict[str, float]]:
+    """Share of the window each station spent in each status."""
+    if status_times is None:
+        status_times = windowed_status_table(stations, start_time, end_time)
+    return normalize_status_times(stations, status_times, end_time - start_time)
+
+@cached_by_state
 def calculate_overall_production(factory, simulation_time: float, time_period: str = None) -> Tuple[int, float]:
     if time_period:
         start_time, end_time = get_time_period_range(time_period, simulation_time)
@@ -42,107 +156,73 @@ def calculate_overall_production(factory, simulation_time: float, time_period: s
         production_rate = total_production / (simulation_time / HOUR)  # Convert to per hour
     return total_production, production_rate
 
-def calculate_workstation_occupancy(factory, simulation_time: float, time_period: str = None) -> Dict[int, float]:
-    occupancy_rates = {}
+@cached_by_state
+def calculate_workstation_occupancy(factory, simulation_time: float, time_period: str = None) -> pd.Series:
+    """Occupancy rate per station, as a Series indexed by station id."""
     if time_period:
-        start_time, end_time = get_time_period_range(time_period, simulation_time)
-        time_range = end_time - start_time
-    else:
-        time_range = simulation_time
-    
-    for station in factory.stations:
-        if time_period:
-            # Filter station history for the time period
-            filtered_history = filter_station_history(station, start_time, end_time)
-            # Calculate occupancy based on filtered history
-            operational_time = sum(event['timestamp'] - filtered_history[i-1]['timestamp'] 
-                                 for i, event in enumerate(filtered_history[1:], 1) 
-                                 if event['status'] == 'Operational')
-            occupancy_rate = operational_time / time_range
-        else:
-            occupancy_rate = station.busy_time / time_range
-        occupancy_rates[station.station_id] = occupancy_rate
-    return occupancy_rates
-
-def calculate_average_waiting_time(factory, time_period: str = None) -> Dict[int, float]:
-    avg_waiting_times = {}
+        return windowed_occupancy(factory.stations, *get_time_period_range(time_period, factory._env.now))
+    operational_times = {station.station_id: station.busy_time for station in factory.stations}
+    return pd.Series(operational_times, dtype=np.float64) / simulation_time
+
+@cached_by_state
+def calculate_average_waiting_time(factory, time_period: str = None) -> pd.Series:
+    """Average waiting time in hours per station (except station 1), indexed by station id."""
+    if time_period:
+        # For time period filtering, we need to look at the status history
+        return windowed_waiting_times(factory.stations, *get_time_period_range(time_period, factory._env.now))
     
-    for station in factory.stations:
-        if station.station_id == 1:  # Skip first station as per requirements
-            continue
-            
-        if time_period:
-            # For time period filtering, we need to look at the status history
-            start_time, end_time = get_time_period_range(time_period, factory._env.now)
-            filtered_history = filter_station_history(station, start_time, end_time)
-            
-            # Calculate waiting time from status changes
-            total_wait_time = 0
-            wait_start = None
-            
-            for event in filtered_history:
-                if event['status'] == 'Waiting' and wait_start is None:
-                    wait_start = event['timestamp']
-                elif event['status'] != 'Waiting' and wait_start is not None:
-                    total_wait_time += event['timestamp'] - wait_start
-                    wait_start = None
-            
-            # Handle case where station is still waiting at end of period
-            if wait_start is not None:
-                total_wait_time += end_time - wait_start
-                
-            # Convert to hours
-            avg_wait = total_wait_time / HOUR
-        else:
-            # For overall average, use the accumulated waiting time
-            if factory.num_waits > 0:
-                avg_wait = station.total_waiting_time / factory.num_waits / HOUR
-            else:
-                avg_wait = 0.0
-                
-        avg_waiting_times[station.station_id] = avg_wait
-        
-    return avg_waiting_times
+    # For overall average, use the accumulated waiting time (skipping the first station as per requirements)
+    waiting_times = pd.Series({station.station_id: station.total_waiting_time
+                               for station in factory.stations if station.station_id != 1},
+                              dtype=np.float64)
+    if factory.num_waits > 0:
+        return waiting_times / factory.num_waits / HOUR
+    return waiting_times * 0.0
 
+@cached_by_state
 def get_workstation_status_partition(factory, time_intervals: List[Tuple[float, float]], time_period: str = None) -> Dict[int, Dict[str, float]]:
-    status_partitions = {}
-    
+    """Share of time each station spent in each status.
+
+    With a time_period, shares come from the status history over that window.
+    Without one, they are the whole-run busy/down/restocking counters, so
+    time_intervals must be a single interval covering the whole run; anything
+    else raises ValueError rather than dividing whole-run totals by a shorter span.
+    """
     if time_period:
-        start_time, end_time = get_time_period_range(time_period, factory._env.now)
-        time_range = end_time - start_time
-    else:
-        time_range = sum(end - start for start, end in time_intervals)
+        return windowed_partition(factory.stations, *get_time_period_range(time_period, factory._env.now))
     
-    for station in factory.stations:
-        station_status = {
-            'Operational': 0.0,
-            'Down': 0.0,
-            'Waiting for restock': 0.0
-        }
-        
-        if time_period:
-            # Filter station history for the time period
-            filtered_history = filter_station_history(station, start_time, end_time)
-            
-            # Calculate time spent in each state
-            for i, event in enumerate(filtered_history[1:], 1):
-                duration = event['timestamp'] - filtered_history[i-1]['timestamp']
-                status = filtered_history[i-1]['status']
-                station_status[status] += duration
-            
-            # Normalize by total time
-            for status in station_status:
-                station_status[status] /= time_range
-        else:
-            # Calculate operational time (busy time)
-            station_status['Operational'] = station.busy_time / time_range
-            
-            # Calculate downtime
-            station_status['Down'] = station.total_downtime / time_range
-            
-            # Calculate waiting for restock time
-            station_status['Waiting for restock'] = station.restocking_time / time_range
-        
-        status_partitions[station.station_id] = station_status
+    intervals = list(time_intervals)
+    if len(intervals) != 1 or intervals[0][0] > 0 or intervals[0][1] < factory._env.now:
+        raise ValueError('time_intervals must be one interval covering the whole run; '
+                         'use time_period for windowed partitions')
+    start, end = intervals[0]
+    # Operational (busy), down and restocking time per station
+    status_times = [(station.busy_time, station.total_downtime, station.restocking_time)
+                    for station in factory.stations]
+    return normalize_status_times(factory.stations, status_times, end - start)
+
+def normalize_status_times(stations, status_times, time_range: float) -> Dict[int, Dict[str, float]]:
+    """Turn per-station seconds in each status into fractions of time_range."""
+    # One row per station, normalized by total time in a single vectorized division
+    # (a new array, so a status table shared with windowed_occupancy stays intact)
+    totals = np.divide(status_times, time_range, dtype=np.float64)
+    return {station.station_id: dict(zip(STATUS_NAMES, row))
+            for station, row in zip(stations, totals.tolist())}
+
+@cached_by_state
+def compute_all_metrics(factory, simulation_time: float, time_period: str = None) -> Tuple[pd.Series, pd.Series, Dict[int, Dict[str, float]]]:
+    """Occupancy, average waiting time and status partition for one period.
+
+    Windowed metrics go through the same helpers as the single functions, with
+    occupancy and partition sharing one status-time table.
+    """
+    if not time_period:
+        return (calculate_workstation_occupancy(factory, simulation_time),
+                calculate_average_waiting_time(factory),
+                get_workstation_status_partition(factory, [(0, simulation_time)]))
     
-    return status_partitions
+    start_time, end_time = get_time_period_range(time_period, factory._env.now)
+    status_times = windowed_status_table(factory.stations, start_time, end_time)
+    return (windowed_occupancy(factory.stations, start_time, end_time, status_times),
+            windowed_waiting_times(factory.stations, start_time, end_time),
+            windowed_partition(factory.stations, start_time, end_time, status_times))
@@ -1,5 +1,8 @@
 import simpy
 import random
+from collections import deque
+from enum import IntEnum
+import numpy as np
 
 # Time scaling constants (in seconds)
 HOUR = 3600
@@ -9,28 +12,82 @@ MONTH = 30 * DAY
 QUARTER = 90 * DAY
 YEAR = 365 * DAY
 
+class Status(IntEnum):
+    """Station status codes, as stored in Station.status_buf."""
+    OPERATIONAL = 0
+    DOWN = 1
+    WAITING_FOR_RESTOCK = 2
+
+# Display names, indexed by Status code
+STATUS_NAMES = ('Operational', 'Down', 'Waiting for restock')
+
+# Random samples are drawn from NumPy in batches of POOL_SIZE, one batch per
+# generator and parameters; call seed() before a run to make it reproducible
+POOL_SIZE = 1 << 16
+rng = np.random.default_rng()
+_pools = {}
+
+def seed(n):
+    """Reseed every random source used by the simulation."""
+    global rng
+    random.seed(n)  # failure and faulty-product checks
+    rng = np.random.default_rng(n)
+    _pools.clear()  # leftover batches were drawn from the old generator
+
+def sample(generate, *params):
+    """Return the next value from the pool of generate(*params, POOL_SIZE) samples, refilling it when empty."""
+    try:
+        return next(_pools[generate, params])
+    except (KeyError, StopIteration):
+        _pools[generate, params] = pool = iter(generate(*params, POOL_SIZE).tolist())
+        return next(pool)
+
+
+def truncated_normal_batch(mean, std_dev, size):
+    """Normal samples with negatives clipped to 0, once for the whole batch."""
+    batch = rng.normal(mean, std_dev, size)
+    np.maximum(batch, 0.0, out=batch)
+    return batch
+
+
+def folded_normal_batch(mean, std_dev, size):
+    """Absolute values of normal samples, taken once for the whole batch."""
+    batch = rng.normal(mean, std_dev, size)
+    np.abs(batch, out=batch)
+    return batch
+
+
+def exponential_batch(mean, size):
+    """Exponential samples with the given mean."""
+    return rng.exponential(mean, size)
+
+
 def normal_time(mean=4.0, std_dev=1.0):
     """Return a truncated normal sample (no negative times)."""
-    val = random.gauss(mean, std_dev)
-    return max(val, 0.0)
+    return sample(truncated_normal_batch, mean, std_dev)
 
 
 def exponential_time(mean=3.0):
     """Return an exponential sample with given mean."""
-    return random.expovariate(1.0 / mean)
+    return sample(exponential_batch, mean)
 
 
 def normal_delay(mean=2.0, std_dev=1.0):
     """Helper for normal restock delays."""
-    val = random.gauss(mean, std_dev)
-    return max(val, 0.0)
+    return sample(truncated_normal_batch, mean, std_dev)
 
 
 class Station:
-    def __init__(self, env, station_id, factory, fail_prob, fix_time_mean=3.0, work_time_mean=4.0):
+    def __init__(self, env, station_id, factory, fail_prob, fix_time_mean=3.0, work_time_mean=4.0, shared=False):
         self.env = env
         self.station_id = station_id
-        self.resource = simpy.Resource(env, capacity=1)  # Only 1 item at a time
+        self.factory = factory
+        # Only 1 item at a time: shared stations (raced for with `req4 | req5`) need
+        # a Resource; the others are only ever entered one after another, so a
+        # lighter FIFO lock (acquire/release) does
+        self.resource = simpy.Resource(env, capacity=1) if shared else None
+        self.locked = False
+        self.lock_waiters = deque()
         self.fail_prob = fail_prob
         self.fix_time_mean = fix_time_mean * HOUR  # Convert to seconds
         self.work_time_mean = work_time_mean * HOUR  # Convert to seconds
@@ -39,7 +96,9 @@ class Station:
         # To handle "check every 5 products" logic:
         self.count_since_check = 0  # how many have been processed since last failure check
         self.is_broken = False
+        self.repaired = env.event()  # succeeded (and replaced) each time a repair finishes
         self.bin = simpy.Container(env, init=25)
+        self.bin_low = env.event()  # succeeded when an item leaves fewer than 5 parts in the bin
 
         # For data collection:
         self.total_downtime = 0.0
@@ -51,26 +110,49 @@ class Station:
         self.env.process(self.restock_process(factory))
         self.restocking_time = 0.0
         
-        # Track status changes
-        self.status_history = []
-        self.current_status = 'Operational'
-        self.record_status_change('Operational')
-
-    def record_status_change(self, new_status: str):
+        # Track status changes: the first n entries of ts_buf/status_buf hold
+        # (timestamp, status code) pairs in time order
+        self.ts_buf = np.empty(64, dtype=np.float64)
+        self.status_buf = np.empty(64, dtype=np.uint8)
+        self.n = 0
+        self.current_status = Status.OPERATIONAL
+        self.record_status_change(Status.OPERATIONAL)
+
+    def record_status_change(self, new_status: Status):
         """Record a status change with timestamp."""
-        self.status_history.append({
-            'timestamp': self.env.now,
-            'station_id': self.station_id,
-            'status': new_status
-        })
+        self.factory.state_version += 1
+        if self.n == len(self.ts_buf):
+            # Double the buffers when full so appends stay amortized O(1)
+            self.ts_buf = np.concatenate((self.ts_buf, np.empty_like(self.ts_buf)))
+            self.status_buf = np.concatenate((self.status_buf, np.empty_like(self.status_buf)))
+        self.ts_buf[self.n] = self.env.now
+        self.status_buf[self.n] = new_status
+        self.n += 1
         self.current_status = new_status
 
+    def acquire(self):
+        """Wait (in arrival order) until the station is free and take it."""
+        if self.locked:
+            turn = self.env.event()
+            self.lock_waiters.append(turn)
+            yield turn  # release() hands the station straight to us
+        else:
+            self.locked = True
+
+    def release(self):
+        """Hand the station to the next waiting item, or mark it free."""
+        if self.lock_waiters:
+            self.lock_waiters.popleft().succeed()
+        else:
+            self.locked = False
+
     def start_processing(self):
         self.last_start_busy = self.env.now
-        self.record_status_change('Operational')
+        self.record_status_change(Status.OPERATIONAL)
 
     def finish_processing(self):
         self.busy_time += (self.env.now - self.last_start_busy)
+        self.factory.state_version += 1
 
     def check_for_failure(self):
         """Check if station fails after 5 items processed."""
@@ -86,26 +168,28 @@ class Station:
 
     def restock_process(self, factory):
         while True:
-            if self.bin.level < 5:
-                self.record_status_change('Waiting for restock')
-                with factory.restock_devices.request() as req:
-                    yield req
-                    start_restocking_time = self.env.now
-                    delay = normal_time(mean=2.0, std_dev=1.0) * HOUR  # Convert to seconds
-                    yield self.env.timeout(delay)
-                    self.restocking_time += (self.env.now - start_restocking_time)
-                    yield self.bin.put(25)
-                    self.record_status_change('Operational')
-            else:
-                # Check less frequently if still enough material
-                yield self.env.timeout(1.0 * HOUR)  # Check every hour
+            if self.bin.level >= 5:
+                # Sleep until process_item takes the bin below the threshold
+                self.bin_low = self.env.event()
+                yield self.bin_low
+            self.record_status_change(Status.WAITING_FOR_RESTOCK)
+            with factory.restock_devices.request() as req:
+                yield req
+                start_restocking_time = self.env.now
+                delay = normal_time(mean=2.0, std_dev=1.0) * HOUR  # Convert to seconds
+                yield self.env.timeout(delay)
+                self.restocking_time += (self.env.now - start_restocking_time)
+                self.factory.state_version += 1
+                yield self.bin.put(25)
+                self.record_status_change(Status.OPERATIONAL)
 
     def break_station(self):
         """Simulate the breakdown."""
         self.is_broken = True
         self.num_breakdowns += 1
+        self.factory.state_version += 1
         self.last_break_time = self.env.now
-        self.record_status_change('Down')
+        self.record_status_change(Status.DOWN)
 
         # Maintenance takes exponentially distributed time
         fix_time = exponential_time(self.fix_time_mean)
@@ -113,16 +197,21 @@ class Station:
 
         # Station is repaired
         self.is_broken = False
+        repaired, self.repaired = self.repaired, self.env.event()
+        repaired.succeed()
         down_duration = self.env.now - self.last_break_time
         self.total_downtime += down_duration
+        self.factory.state_version += 1
         self.last_break_time = None
-        self.record_status_change('Operational')
+        self.record_status_change(Status.OPERATIONAL)
 
     def process_item(self):
         while self.is_broken:
-            yield self.env.timeout(0.1 * HOUR)  # Check every 6 minutes
+            yield self.repaired  # Wake up once maintenance is done
 
         yield self.bin.get(1)
+        if self.bin.level < 5 and not self.bin_low.triggered:
+            self.bin_low.succeed()
 
         self.start_processing()
         processing_time = normal_time(mean=self.work_time_mean, std_dev=1.0)
@@ -130,12 +219,14 @@ class Station:
         self.finish_processing()
 
         if self.check_for_failure():
-            yield self.env.process(self.break_station())
+            yield from self.break_station()
 
 
 class Factory(object):
     def __init__(self, env: simpy.Environment):
         self._env = env
+        # Bumped on every change that metrics read, so their results can be cached
+        self.state_version = 0
         self.items = 0
         stations = []
         self.restock_devices = simpy.Resource(env, capacity=3)
@@ -144,7 +235,8 @@ class Factory(object):
         self.accidents_occurred = 0
         fail_probs = [0.02, 0.01, 0.05, 0.15, 0.07, 0.06]
         for i in range(6):
-            stations.append(Station(env, i+1, self, fail_prob=fail_probs[i]))
+            # Stations 4 and 5 are raced for by item_processor
+            stations.append(Station(env, i+1, self, fail_prob=fail_probs[i], shared=i in (3, 4)))
         self.stations = stations
         self.action = env.process(self.production())
         self.total_wait_time = 0.0
@@ -153,34 +245,32 @@ class Factory(object):
     def production(self):
         while True:
             self.items += 1
-            waiting_time = abs(random.normalvariate(3, 0.5)) * HOUR  # Convert to seconds
+            waiting_time = sample(folded_normal_batch, 3, 0.5) * HOUR  # Convert to seconds
             yield self._env.timeout(waiting_time)
             item_id = self.items
             self._env.process(self.item_processor(item_id))
 
     def item_processor(self, item_id: int):
-
-        yield self._env.process(self.process_at_station(self.stations[0], item_id))
-
-        yield self._env.process(self.process_at_station(self.stations[1], item_id))
-
-        yield self._env.process(self.process_at_station(self.stations[2], item_id))
+        # Every stage runs inline in this item's process; stations 1-3 are strictly sequential
+        for station in self.stations[:3]:
+            yield from self.process_at_station(station, item_id)
 
         req4 = self.stations[3].resource.request()
         req5 = self.stations[4].resource.request()
         res = yield req4 | req5
         if req4 in res:
-            yield self._env.process(self.process_at_station(self.stations[3], item_id, request=req4))
-            yield self._env.process(self.process_at_station(self.stations[4], item_id, request=req5))
+            yield from self.process_at_station(self.stations[3], item_id, request=req4)
+            yield from self.process_at_station(self.stations[4], item_id, request=req5)
         else:
-            yield self._env.process(self.process_at_station(self.stations[4], item_id, request=req5))
-            yield self._env.process(self.process_at_station(self.stations[3], item_id, request=req4))
-        yield self._env.process(self.process_at_station(self.stations[5], item_id))
+            yield from self.process_at_station(self.stations[4], item_id, request=req5)
+            yield from self.process_at_station(self.stations[3], item_id, request=req4)
+        yield from self.process_at_station(self.stations[5], item_id)
 
         if random.random() < 0.05:
             self.faulty_products += 1
         else:
             self.total_produced += 1
+        self.state_version += 1
 
     def waiting_end(self, wait_start, station):
         if station.station_id != 1:
@@ -189,19 +279,23 @@ class Factory(object):
             self.total_wait_time += wait_time
             station.total_waiting_time += wait_time
             self.num_waits += 1
+            self.state_version += 1
 
     def process_at_station(self, station, item_id, request=None):
         wait_start = self._env.now
         if request is not None:
             yield request
             self.waiting_end(wait_start, station)
-            yield self._env.process(station.process_item())
+            yield from station.process_item()
             station.resource.release(request)
         else:
-            with station.resource.request() as req:
-                yield req
-                self.waiting_end(wait_start,station)
-                yield self._env.process(station.process_item())
+            # Sequential stations never need Resource request semantics
+            yield from station.acquire()
+            try:
+                self.waiting_end(wait_start, station)
+                yield from station.process_item()
+            finally:
+                station.release()
 
 if __name__ == '__main__':
     env = simpy.Environment()